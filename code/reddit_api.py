@@ -1,12 +1,22 @@
 import argparse
+import asyncio
+import functools
+import heapq
 import os
 from pathlib import Path
 from typing import Dict, List, Optional
 
 import pandas as pd
-import praw
+import asyncpraw
 from dotenv import load_dotenv
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pragma: no cover - optional fast path
+    pa = None
+    pa_csv = None
+
 
 DEFAULT_SUBREDDITS = [
     "politics",
@@ -14,10 +24,40 @@ DEFAULT_SUBREDDITS = [
     "worldnews",
 ]
 
+# Repository-level output/ directory, resolved once at import
+DEFAULT_OUTPUT_DIR = Path(__file__).resolve().parents[1] / "output"
+
+# Upper bound on in-flight Reddit API requests, to respect rate limits
+MAX_CONCURRENT_REQUESTS = 8
+
+# Buffer size for CSV writes; fewer, larger write() calls than the default
+CSV_WRITE_BUFFER_SIZE = 1024 * 1024
+
+POST_COLUMNS = ["subreddit", "id", "title", "score", "num_comments", "url"]
+COMMENT_COLUMNS = ["post_id", "body", "score"]
+
+# Column-oriented records: one list per field, all lists the same length
+Columns = Dict[str, List[object]]
+
 
+def empty_columns(names: List[str]) -> Columns:
+    """Return a column-oriented container with an empty list per field."""
+    return {name: [] for name in names}
+
+
+def extend_columns(target: Columns, other: Columns) -> None:
+    """Append every column of `other` onto the matching column of `target`."""
+    for name, values in target.items():
+        values.extend(other[name])
+
+
+@functools.lru_cache(maxsize=1)
 def load_config_from_env() -> Dict[str, str]:
     """Load Reddit API credentials and user agent from environment variables.
 
+    The result is cached so `.env` is only parsed once per process; callers
+    must treat the returned dict as read-only.
+
     Expected variables:
       - REDDIT_CLIENT_ID
       - REDDIT_CLIENT_SECRET
@@ -58,10 +98,13 @@ def load_config_from_env() -> Dict[str, str]:
     }
 
 
-def get_reddit_client() -> praw.Reddit:
-    """Instantiate and return an authenticated PRAW Reddit client."""
+def get_reddit_client() -> asyncpraw.Reddit:
+    """Instantiate and return an authenticated Async PRAW Reddit client.
+
+    Must be called from within a running event loop; close it with `await reddit.close()`.
+    """
     cfg = load_config_from_env()
-    reddit = praw.Reddit(
+    reddit = asyncpraw.Reddit(
         client_id=cfg["client_id"],
         client_secret=cfg["client_secret"],
         username=cfg["username"],
@@ -70,7 +113,7 @@ def get_reddit_client() -> praw.Reddit:
     )
     # Simple sanity check: ensure read-only can be disabled (we need script capabilities)
     if reddit.read_only:
-        # PRAW marks script apps as not read-only when username/password are provided
+        # Async PRAW marks script apps as not read-only when username/password are provided
         # but if it still shows read_only=True, alert the user.
         raise RuntimeError(
             "Reddit client is read-only. Ensure you are using a 'script' app and provided username/password."
@@ -78,17 +121,17 @@ def get_reddit_client() -> praw.Reddit:
     return reddit
 
 
-def fetch_posts_for_subreddit(
-    reddit: praw.Reddit,
+async def fetch_posts_for_subreddit(
+    reddit: asyncpraw.Reddit,
     subreddit_name: str,
     mode: str = "hot",
     limit: int = 20,
-) -> List[Dict[str, object]]:
-    """Fetch posts for a given subreddit and return extracted fields.
+) -> Columns:
+    """Fetch posts for a given subreddit and return extracted fields as columns.
 
     Extracted fields: title, score, num_comments, id, url, subreddit
     """
-    subreddit = reddit.subreddit(subreddit_name)
+    subreddit = await reddit.subreddit(subreddit_name)
     if mode == "hot":
         submissions = subreddit.hot(limit=limit)
     elif mode == "top":
@@ -96,84 +139,132 @@ def fetch_posts_for_subreddit(
     else:
         raise ValueError("mode must be 'hot' or 'top'")
 
-    posts: List[Dict[str, object]] = []
-    for submission in submissions:
-        posts.append(
-            {
-                "subreddit": subreddit_name,
-                "id": submission.id,
-                "title": submission.title,
-                "score": int(submission.score),
-                "num_comments": int(submission.num_comments),
-                "url": submission.url,
-            }
-        )
-    return posts
+    ids: List[object] = []
+    titles: List[object] = []
+    scores: List[object] = []
+    num_comments: List[object] = []
+    urls: List[object] = []
+    async for submission in submissions:
+        ids.append(submission.id)
+        titles.append(submission.title)
+        scores.append(submission.score)
+        num_comments.append(submission.num_comments)
+        urls.append(submission.url)
+    return {
+        "subreddit": [subreddit_name] * len(ids),
+        "id": ids,
+        "title": titles,
+        "score": scores,
+        "num_comments": num_comments,
+        "url": urls,
+    }
+
 
+async def _fetch_comments_for_post(
+    reddit: asyncpraw.Reddit,
+    post_id: str,
+    comments_per_post: int,
+) -> Columns:
+    """Fetch up to `comments_per_post` top comments for a single post.
 
-def fetch_top_comments_for_posts(
-    reddit: praw.Reddit,
-    posts: List[Dict[str, object]],
+    Returns empty columns if the comments cannot be fetched (e.g., deleted, locked).
+    """
+    bodies: List[object] = []
+    scores: List[object] = []
+    # Request only a shallow, size-limited listing of top-level comments instead of
+    # loading the full comment tree via `submission.comments`
+    params = {"limit": comments_per_post, "depth": 1, "sort": "top"}
+    try:
+        _, comment_listing = await reddit.get(f"comments/{post_id}/", params=params)
+        for comment in comment_listing:
+            if hasattr(comment, "body"):
+                bodies.append(comment.body)
+                scores.append(getattr(comment, "score", 0))
+            if len(bodies) >= comments_per_post:
+                break
+    except Exception as exc:  # noqa: BLE001
+        # Continue with next post if any issue arises (e.g., deleted, locked)
+        print(f"Warning: failed to fetch comments for post {post_id}: {exc}")
+        return empty_columns(COMMENT_COLUMNS)
+    return {"post_id": [post_id] * len(bodies), "body": bodies, "score": scores}
+
+
+async def fetch_top_comments_for_posts(
+    reddit: asyncpraw.Reddit,
+    posts: Columns,
     comments_per_post: int = 5,
     subset_size: Optional[int] = 10,
-) -> List[Dict[str, object]]:
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+) -> Columns:
     """Fetch up to `comments_per_post` top comments for a subset of the most relevant posts.
 
     The subset is determined by highest post score. If subset_size is None, use all posts.
+    Posts are fetched concurrently with at most `max_concurrency` requests in flight.
     Extracted fields: body, score, post_id
     """
+    post_ids = posts["id"]
+    post_scores = posts["score"]
     if subset_size is not None and subset_size > 0:
-        # Sort by score descending and select top N
-        sorted_posts = sorted(posts, key=lambda p: int(p.get("score", 0)), reverse=True)
-        selected_posts = sorted_posts[: subset_size]
+        # Select top N by score without sorting all posts
+        top = heapq.nlargest(subset_size, range(len(post_ids)), key=post_scores.__getitem__)
+        selected_ids = [str(post_ids[i]) for i in top]
     else:
-        selected_posts = list(posts)
-
-    comments: List[Dict[str, object]] = []
-    for post in selected_posts:
-        submission = reddit.submission(id=str(post["id"]))
-        try:
-            submission.comment_sort = "top"
-            submission.comments.replace_more(limit=0)
-            count = 0
-            for comment in submission.comments:
-                if hasattr(comment, "body"):
-                    comments.append(
-                        {
-                            "post_id": post["id"],
-                            "body": comment.body,
-                            "score": int(getattr(comment, "score", 0)),
-                        }
-                    )
-                    count += 1
-                if count >= comments_per_post:
-                    break
-        except Exception as exc:  # noqa: BLE001
-            # Continue with next post if any issue arises (e.g., deleted, locked)
-            print(f"Warning: failed to fetch comments for post {post['id']}: {exc}")
-            continue
+        selected_ids = [str(post_id) for post_id in post_ids]
+
+    comments = empty_columns(COMMENT_COLUMNS)
+    if not selected_ids:
+        return comments
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def fetch_one(post_id: str) -> Columns:
+        async with semaphore:
+            return await _fetch_comments_for_post(reddit, post_id, comments_per_post)
+
+    results = await asyncio.gather(*(fetch_one(post_id) for post_id in selected_ids))
 
+    for post_comments in results:
+        extend_columns(comments, post_comments)
     return comments
 
 
+@functools.lru_cache(maxsize=None)
 def ensure_output_dir(output_dir: Path) -> None:
     output_dir.mkdir(parents=True, exist_ok=True)
 
 
-def save_csv_rows(rows: List[Dict[str, object]], csv_path: Path, columns: List[str]) -> None:
-    if not rows:
-        # Create empty CSV with headers for consistency
-        pd.DataFrame(columns=columns).to_csv(csv_path, index=False)
-        return
-    df = pd.DataFrame(rows)
-    # Reorder/limit columns if specified
-    df = df[columns]
-    df.to_csv(csv_path, index=False)
+def _write_frame(df: pd.DataFrame, path: Path) -> None:
+    """Write `df` to `path`, choosing the format from the file suffix."""
+    if path.suffix == ".parquet":
+        df.to_parquet(path, engine="pyarrow", compression="zstd", index=False)
+    elif path.suffix == ".feather":
+        df.reset_index(drop=True).to_feather(path, compression="zstd")
+    else:
+        table = None
+        if pa is not None:
+            try:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+            except pa.ArrowException:
+                # Mixed-type object columns: fall back to the pandas writer
+                table = None
+        with open(path, "wb", buffering=CSV_WRITE_BUFFER_SIZE) as f:
+            if table is not None:
+                pa_csv.write_csv(table, f, write_options=pa_csv.WriteOptions(include_header=True, delimiter=","))
+            else:
+                df.to_csv(f, index=False)
+
+
+def save_csv_rows(data: Columns, csv_path: Path, columns: List[str]) -> None:
+    """Save column-oriented `data` to `csv_path`; `.parquet` and `.feather` suffixes select a binary format."""
+    # Build directly from per-field lists, reordering/limiting to `columns`;
+    # with no rows this still writes the headers for consistency
+    df = pd.DataFrame({name: data.get(name, []) for name in columns}, columns=columns)
+    _write_frame(df, csv_path)
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
-        description="Collect Reddit posts and comments using PRAW and save to CSV."
+        description="Collect Reddit posts and comments using Async PRAW and save to CSV."
     )
     parser.add_argument(
         "--subreddits",
@@ -211,58 +302,96 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--output-dir",
         type=str,
-        default=str(Path(__file__).resolve().parents[1] / "output"),
+        default=str(DEFAULT_OUTPUT_DIR),
         help="Directory to write CSV outputs",
     )
+    parser.add_argument(
+        "--format",
+        choices=["csv", "parquet", "feather"],
+        default="csv",
+        help="Output file format for posts and comments",
+    )
     return parser.parse_args()
 
 
-def main() -> None:
-    args = parse_args()
+async def fetch_posts_for_subreddits(
+    reddit: asyncpraw.Reddit,
+    subreddit_names: List[str],
+    mode: str = "hot",
+    limit: int = 20,
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+) -> Columns:
+    """Fetch posts for several subreddits concurrently and merge them in input order.
+
+    A subreddit that fails (e.g., private, banned) is reported and skipped.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def fetch_one(subreddit_name: str) -> Columns:
+        async with semaphore:
+            print(f"Fetching {mode} posts from r/{subreddit_name} ...")
+            return await fetch_posts_for_subreddit(reddit, subreddit_name, mode=mode, limit=limit)
+
+    results = await asyncio.gather(
+        *(fetch_one(name) for name in subreddit_names), return_exceptions=True
+    )
+
+    all_posts = empty_columns(POST_COLUMNS)
+    for subreddit_name, result in zip(subreddit_names, results):
+        if isinstance(result, BaseException):
+            print(f"Warning: failed to fetch posts for r/{subreddit_name}: {result}")
+            continue
+        extend_columns(all_posts, result)
+    return all_posts
+
+
+async def main_async(args: argparse.Namespace) -> None:
     output_dir = Path(args.output_dir)
     ensure_output_dir(output_dir)
 
     reddit = get_reddit_client()
-
-    all_posts: List[Dict[str, object]] = []
-    for subreddit in args.subreddits:
-        print(f"Fetching {args.mode} posts from r/{subreddit} ...")
-        posts = fetch_posts_for_subreddit(
+    try:
+        all_posts = await fetch_posts_for_subreddits(
             reddit=reddit,
-            subreddit_name=subreddit,
+            subreddit_names=args.subreddits,
             mode=args.mode,
             limit=args.posts_per_subreddit,
         )
-        all_posts.extend(posts)
-
-    print("Selecting posts for comment collection and fetching comments ...")
-    comments = fetch_top_comments_for_posts(
-        reddit=reddit,
-        posts=all_posts,
-        comments_per_post=args.comments_per_post,
-        subset_size=(None if args.subset_size == 0 else args.subset_size),
-    )
 
-    posts_csv = output_dir / "posts.csv"
-    comments_csv = output_dir / "comments.csv"
+        print("Selecting posts for comment collection and fetching comments ...")
+        comments = await fetch_top_comments_for_posts(
+            reddit=reddit,
+            posts=all_posts,
+            comments_per_post=args.comments_per_post,
+            subset_size=(None if args.subset_size == 0 else args.subset_size),
+        )
+    finally:
+        await reddit.close()
+
+    posts_csv = output_dir / f"posts.{args.format}"
+    comments_csv = output_dir / f"comments.{args.format}"
 
     print(f"Writing posts to {posts_csv} ...")
     save_csv_rows(
-        rows=all_posts,
+        data=all_posts,
         csv_path=posts_csv,
-        columns=["subreddit", "id", "title", "score", "num_comments", "url"],
+        columns=POST_COLUMNS,
     )
 
     print(f"Writing comments to {comments_csv} ...")
     save_csv_rows(
-        rows=comments,
+        data=comments,
         csv_path=comments_csv,
-        columns=["post_id", "body", "score"],
+        columns=COMMENT_COLUMNS,
     )
 
     print("Done.")
 
 
+def main() -> None:
+    asyncio.run(main_async(parse_args()))
+
+
 if __name__ == "__main__":
     main()
 
@@ -1,12 +1,11 @@
-import sys, time
+import argparse, sys, time
 from pathlib import Path
 import pandas as pd
+from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
+from selenium.common.exceptions import TimeoutException
  
 BASE = "https://finance.yahoo.com/markets/stocks/gainers"
  
@@ -32,6 +31,13 @@ def build_driver(headless=False):
     opts.add_argument("--disable-quic")
     opts.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
     opts.add_experimental_option("useAutomationExtension", False)
+    # No cargar imágenes ni notificaciones: solo se necesita el DOM de la tabla
+    opts.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    })
+    # driver.get() retorna en DOMContentLoaded; wait_rows espera la tabla
+    opts.page_load_strategy = "eager"
     opts.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36")
     d = webdriver.Chrome(options=opts)
     d.set_page_load_timeout(90)
@@ -39,9 +45,20 @@ def build_driver(headless=False):
     return d
  
 # Esperar hasta que haya al menos `min_rows` filas en la tabla
+# (un MutationObserver en la página en lugar de sondear con find_elements)
 def wait_rows(d, min_rows, timeout=60):
-    WebDriverWait(d, timeout).until(EC.presence_of_element_located((By.CSS_SELECTOR, "section table")))
-    WebDriverWait(d, timeout).until(lambda x: len(x.find_elements(By.CSS_SELECTOR, "section table tbody tr")) >= min_rows)
+    script = """
+const cb = arguments[arguments.length - 1];
+const need = arguments[0];
+const check = () => document.querySelectorAll('section table tbody tr').length >= need;
+if (check()) return cb(true);
+const obs = new MutationObserver(() => { if (check()) { obs.disconnect(); cb(true); } });
+obs.observe(document.documentElement, {childList: true, subtree: true});
+setTimeout(() => { obs.disconnect(); cb(check()); }, arguments[1] * 1000);
+"""
+    d.set_script_timeout(timeout + 5)
+    if not d.execute_async_script(script, min_rows, timeout):
+        raise TimeoutException(f"Menos de {min_rows} filas tras {timeout}s")
  
 # Aceptar cookies si aparece el botón
 def accept_cookies(d):
@@ -60,21 +77,16 @@ def accept_cookies(d):
             except Exception:
                 pass
  
-# Extraer (símbolo, nombre) de las filas de la tabla
+# Extraer (símbolo, nombre) de las filas de la tabla en una sola llamada JS
+# (evita un round-trip a ChromeDriver por fila/celda y los elementos "stale")
 def extract_rows(d):
-    out = []
-    rows = d.find_elements(By.CSS_SELECTOR, "section table tbody tr")
-    for r in rows:
-        try:
-            tds = r.find_elements(By.CSS_SELECTOR, "td")
-            if len(tds) >= 2:
-                sym = tds[0].text.strip()
-                name = tds[1].text.strip()
-                if sym and name:
-                    out.append((sym, name))
-        except StaleElementReferenceException:
-            continue
-    return out
+    js = """
+return Array.from(document.querySelectorAll('section table tbody tr')).map(r => {
+  const t = r.querySelectorAll('td');
+  return t.length >= 2 ? [t[0].innerText.trim(), t[1].innerText.trim()] : null;
+}).filter(x => x && x[0] && x[1]);
+"""
+    return [tuple(row) for row in (d.execute_script(js) or [])]
  
 # Cargar la URL con reintentos y esperar filas
 def load_with_retry(d, url, min_rows, tries=3):
@@ -94,9 +106,49 @@ def load_with_retry(d, url, min_rows, tries=3):
         print("Carga fallida:", last_err, file=sys.stderr)
     return False
  
+# Descargar una página con fetch() dentro de la sesión actual (sin navegar ni renderizar)
+# y extraer (símbolo, nombre) del HTML devuelto
+def fetch_rows_in_page(d, url, timeout=60):
+    script = """
+const cb = arguments[arguments.length - 1];
+fetch(arguments[0], {credentials: 'include'})
+  .then(r => r.ok ? r.text() : null)
+  .then(cb)
+  .catch(() => cb(null));
+"""
+    try:
+        d.set_script_timeout(timeout)
+        html = d.execute_async_script(script, url)
+    except Exception as e:
+        print("Fetch en página fallido:", e, file=sys.stderr)
+        return []
+    if not html:
+        return []
+    out = []
+    for r in BeautifulSoup(html, "html.parser").select("section table tbody tr"):
+        tds = r.find_all("td")
+        if len(tds) >= 2:
+            sym = tds[0].get_text(" ", strip=True)
+            name = tds[1].get_text(" ", strip=True)
+            if sym and name:
+                out.append((sym, name))
+    return out
+ 
+# Argumentos de línea de comandos
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scrape Yahoo Finance top gainers and build a ranked portfolio.")
+    parser.add_argument(
+        "--format",
+        choices=["xlsx", "parquet"],
+        default="xlsx",
+        help="Formato de salida para históricos y cartera (parquet: un archivo por hoja)",
+    )
+    return parser.parse_args()
+ 
 # Función principal
 def main():
-    d = build_driver(headless=False)
+    args = parse_args()
+    d = build_driver(headless=True)
     try:
         # --- SCRAPING 50 TOP GAINERS ---
         data = []
@@ -108,26 +160,20 @@ def main():
         page1 = extract_rows(d)[:25]
         data.extend(page1)
  
-        ok2 = load_with_retry(d, f"{BASE}?count=25&offset=25", min_rows=25)
-        if not ok2:
-            print("No se pudo cargar la página 2 de ganadores.", file=sys.stderr)
-            sys.exit(1)
-        page2 = extract_rows(d)[:25]
-        seen = set(data)
-        for tup in page2:
-            if tup not in seen and len(data) < 50:
-                data.append(tup)
-                seen.add(tup)
+        # Página 2: fetch() en la sesión ya abierta; si el HTML no trae la tabla, navegar
+        page2 = fetch_rows_in_page(d, f"{BASE}?count=25&offset=25")[:25]
+        if len(page2) < 25:
+            ok2 = load_with_retry(d, f"{BASE}?count=25&offset=25", min_rows=25)
+            if not ok2:
+                print("No se pudo cargar la página 2 de ganadores.", file=sys.stderr)
+                sys.exit(1)
+            page2 = extract_rows(d)[:25]
+        # deduplicar preservando orden y limitar a 50
+        data = list(dict.fromkeys(data + page2))[:50]
  
         if len(data) < 50:
             if load_with_retry(d, f"{BASE}?count=100", min_rows=50):
-                allrows = extract_rows(d)
-                unique, s = [], set()
-                for tup in allrows:
-                    if tup not in s:
-                        unique.append(tup); s.add(tup)
-                    if len(unique) == 50:
-                        break
+                unique = list(dict.fromkeys(extract_rows(d)))[:50]
                 if len(unique) >= len(data):
                     data = unique
  
@@ -140,7 +186,8 @@ def main():
  
         out_csv = OUTPUT_DIR / "yahoo_top_gainers_50.csv"
         OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-        df.to_csv(out_csv, index=False, sep=";", encoding="utf-8-sig")
+        with open(out_csv, "wb", buffering=1024 * 1024) as f:
+            df.to_csv(f, index=False, sep=";", encoding="utf-8-sig")
         print(f"\nFilas obtenidas: {len(df)}")
         print(f"Guardado en: {out_csv}")
  
@@ -151,48 +198,44 @@ def main():
         syms = df["symbol"].astype(str).str.upper().str.strip().tolist()
  
         def fetch_adj(symbols):
+            # Una sola descarga para todos los símbolos (yfinance paraleliza con threads=True)
+            raw = None
+            for _ in range(2):
+                try:
+                    raw = yf.download(
+                        tickers=symbols,
+                        period="1y",
+                        interval="1mo",
+                        auto_adjust=False,
+                        group_by="column",
+                        threads=True,
+                        progress=False,
+                    )
+                    break
+                except Exception:
+                    time.sleep(1.5)
+ 
             all_adj = pd.DataFrame()
-            for i in range(0, len(symbols), 20):
-                batch = symbols[i:i+20]
-                tries = 0
-                while tries < 2:
-                    try:
-                        raw = yf.download(
-                            tickers=batch,
-                            period="1y",
-                            interval="1mo",
-                            auto_adjust=False,
-                            group_by="column",
-                            threads=True,
-                            progress=False,
-                        )
-                        break
-                    except Exception:
-                        tries += 1
-                        time.sleep(1.5)
-                else:
-                    continue
- 
-                if isinstance(raw.columns, pd.MultiIndex):
-                    if "Adj Close" not in raw.columns.levels[0]:
-                        continue
-                    adj_b = raw["Adj Close"].copy()
-                else:
-                    if "Adj Close" not in raw.columns:
-                        continue
-                    adj_b = raw[["Adj Close"]].copy()
-                    if len(batch) == 1:
-                        adj_b.columns = [batch[0]]
- 
-                if isinstance(adj_b.columns, pd.MultiIndex):
-                    adj_b.columns = adj_b.columns.get_level_values(-1)
-                if getattr(adj_b.index, "tz", None) is not None:
-                    adj_b.index = adj_b.index.tz_localize(None)
- 
-                adj_b.index = adj_b.index.to_period("M").to_timestamp("M")
-                adj_b = adj_b.groupby(adj_b.index).last().sort_index().tail(12)
- 
-                all_adj = adj_b if all_adj.empty else all_adj.join(adj_b, how="outer")
+            if raw is None or raw.empty:
+                all_adj.index.name = "Date"
+                return all_adj
+ 
+            if isinstance(raw.columns, pd.MultiIndex):
+                if "Adj Close" in raw.columns.levels[0]:
+                    all_adj = raw["Adj Close"].copy()
+            elif "Adj Close" in raw.columns:
+                all_adj = raw[["Adj Close"]].copy()
+                if len(symbols) == 1:
+                    all_adj.columns = [symbols[0]]
+ 
+            if not all_adj.empty:
+                if isinstance(all_adj.columns, pd.MultiIndex):
+                    all_adj.columns = all_adj.columns.get_level_values(-1)
+                if getattr(all_adj.index, "tz", None) is not None:
+                    all_adj.index = all_adj.index.tz_localize(None)
+ 
+                all_adj.index = all_adj.index.to_period("M").to_timestamp("M")
+                all_adj = all_adj.groupby(all_adj.index).last().sort_index().tail(12)
  
             all_adj.index.name = "Date"
             return all_adj
@@ -201,25 +244,25 @@ def main():
  
         # ===== Segundo Excel: matriz "ancha" por símbolo (1 hoja) =====
         hist_wide = adj.T.copy()
+ 
+        # renombrar headers de fecha a 'YYYY-MM' (antes de agregar la columna 'symbol')
+        if isinstance(hist_wide.columns, pd.DatetimeIndex):
+            hist_wide.columns = hist_wide.columns.strftime("%Y-%m").rename(None)
+ 
         hist_wide.index.name = "symbol"
         hist_wide = hist_wide.reset_index()
  
-        # renombrar headers de fecha a 'YYYY-MM'
-        hist_cols = []
-        for c in hist_wide.columns:
-            if isinstance(c, pd.Timestamp):
-                hist_cols.append(c.strftime("%Y-%m"))
-            else:
-                hist_cols.append(c)
-        hist_wide.columns = hist_cols
- 
         # agregar nombre y ordenar columnas
         hist_wide = df[["symbol", "name"]].merge(hist_wide, on="symbol", how="left")
         order_cols = ["symbol", "name"] + [c for c in hist_wide.columns if c not in ("symbol", "name")]
  
         out_hist = OUTPUT_DIR / "adj_close_monthly_1y_wide.xlsx"
-        with pd.ExcelWriter(out_hist) as w:
-            hist_wide[order_cols].to_excel(w, index=False, sheet_name="HistWide")
+        if args.format == "parquet":
+            out_hist = out_hist.with_suffix(".parquet")
+            hist_wide[order_cols].to_parquet(out_hist, engine="pyarrow", compression="zstd", index=False)
+        else:
+            with pd.ExcelWriter(out_hist, engine="xlsxwriter") as w:
+                hist_wide[order_cols].to_excel(w, index=False, sheet_name="HistWide")
  
         print(f"Excel históricos (1 hoja): {out_hist}")
  
@@ -235,15 +278,21 @@ def main():
         first6_full_idx = idx[:7]       # meses 0..6
         retn_first6 = prices.loc[first6_full_idx].pct_change().iloc[1:]  # 6 retornos mensuales
  
-        # Media geométrica mensual (por símbolo)
-        counts = retn_first6.count()
-        mean_geom_first6m = (1.0 + retn_first6).prod() ** (1.0 / counts) - 1.0
- 
-        # Media aritmética mensual (por referencia)
-        mean_arith_first6m = retn_first6.mean()
- 
-        # Volatilidad mensual
-        vol_first6m = retn_first6.std(ddof=0)
+        # Estadísticos por símbolo sobre el ndarray (columnas=símbolos), ignorando NaN
+        arr = retn_first6.to_numpy(dtype=float)
+        mask = ~np.isnan(arr)
+        counts = mask.sum(axis=0)
+        vals = np.where(mask, arr, 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Media geométrica mensual: expm1(mean(log1p(r))), estable frente a prod() ** (1/n)
+            geom = np.expm1(np.where(mask, np.log1p(vals), 0.0).sum(axis=0) / counts)
+            # Media aritmética mensual (por referencia)
+            arith = vals.sum(axis=0) / counts
+            # Volatilidad mensual (ddof=0)
+            vol = np.sqrt(np.where(mask, (arr - arith) ** 2, 0.0).sum(axis=0) / counts)
+        mean_geom_first6m = pd.Series(geom, index=retn_first6.columns)
+        mean_arith_first6m = pd.Series(arith, index=retn_first6.columns)
+        vol_first6m = pd.Series(vol, index=retn_first6.columns)
  
         # Puntaje ajustado por volatilidad (Sharpe-like)
         vol_adj = vol_first6m.replace(0, np.nan)
@@ -284,11 +333,20 @@ def main():
         })
  
         out_port = OUTPUT_DIR / "portfolio_last6m_ranked.xlsx"
-        with pd.ExcelWriter(out_port) as w:
-            selected.reset_index().rename(columns={"index": "symbol"}).to_excel(w, index=False, sheet_name="Selection")
-            retn_last6_sel.to_excel(w, index=True,  sheet_name="StockReturns_Last6M")
-            port_m.to_excel(w,         index=True,  sheet_name="Portfolio_Last6M")
-            port_summary.to_excel(w,   index=False, sheet_name="Summary")
+        if args.format == "parquet":
+            # Parquet no tiene hojas: un directorio con un archivo por hoja
+            out_port = out_port.with_suffix("")
+            out_port.mkdir(parents=True, exist_ok=True)
+            selected.reset_index().rename(columns={"index": "symbol"}).to_parquet(out_port / "Selection.parquet", compression="zstd", index=False)
+            retn_last6_sel.to_parquet(out_port / "StockReturns_Last6M.parquet", compression="zstd", index=True)
+            port_m.to_parquet(out_port / "Portfolio_Last6M.parquet",            compression="zstd", index=True)
+            port_summary.to_parquet(out_port / "Summary.parquet",               compression="zstd", index=False)
+        else:
+            with pd.ExcelWriter(out_port, engine="xlsxwriter") as w:
+                selected.reset_index().rename(columns={"index": "symbol"}).to_excel(w, index=False, sheet_name="Selection")
+                retn_last6_sel.to_excel(w, index=True,  sheet_name="StockReturns_Last6M")
+                port_m.to_excel(w,         index=True,  sheet_name="Portfolio_Last6M")
+                port_summary.to_excel(w,   index=False, sheet_name="Summary")
  
         print("Criterio: media geométrica mensual alta y volatilidad baja (primeros 6 meses).")
         print(f"Acciones elegidas ({selected.shape[0]}): {', '.join(selected.index)}")